@@ -4,27 +4,135 @@ import json
 import google.generativeai as genai
 import hashlib
 import fpdf
+import functools
+import sqlite3
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
 from fpdf import FPDF
 from fpdf.enums import XPos, YPos
 from datetime import datetime
 
 # --- LLM & Caching ---
 
-def get_company_description(ticker: str, cache: dict) -> str:
+# Gemini free-tier quota for gemini-1.5-flash.
+GEMINI_REQUESTS_PER_MINUTE = 15
+
+class TokenBucket:
     """
-    Generates a company description using the Gemini API, with local caching.
-    The cache key is a hash of the prompt to ensure that changes to the prompt
-    invalidate the cache.
+    A thread-safe token bucket rate limiter.
 
-    Args:
-        ticker (str): The stock ticker of the company.
-        cache (dict): A dictionary used for caching results to avoid repeated API calls.
+    Tokens refill continuously at `rate` per second up to `capacity`, and
+    acquire() only blocks when the bucket is empty.
+    """
 
-    Returns:
-        str: A one-paragraph description of the company's business.
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, waiting for the bucket to refill if necessary."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+# Shared by all threads so concurrent requests stay within the Gemini quota. A capacity
+# of one spaces requests evenly, so no 60 s window ever sees more than the quota; a
+# larger bucket would let a burst through on top of the steady refill.
+_gemini_bucket = TokenBucket(rate=GEMINI_REQUESTS_PER_MINUTE / 60, capacity=1)
+
+class SqliteCache:
+    """
+    A dict-like cache of LLM responses stored in a SQLite table.
+
+    Every write is committed immediately, so descriptions generated before a crash
+    are kept, and a write costs one row instead of rewriting the whole cache file.
+    Access is serialized with a lock so one instance can be shared by worker threads.
     """
-    # Define the prompt first to generate the cache key
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache(key TEXT PRIMARY KEY, value TEXT, created REAL)")
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        """Runs one statement under the lock and returns all resulting rows."""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def __contains__(self, key: str) -> bool:
+        return bool(self._query("SELECT 1 FROM cache WHERE key = ?", (key,)))
+
+    def __getitem__(self, key: str) -> str:
+        rows = self._query("SELECT value FROM cache WHERE key = ?", (key,))
+        if not rows:
+            raise KeyError(key)
+        return rows[0][0]
+
+    def __setitem__(self, key: str, value: str):
+        self._query("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, value, time.time()))
+
+    def __delitem__(self, key: str):
+        self._query("DELETE FROM cache WHERE key = ?", (key,))
+
+    def __iter__(self):
+        return iter([row[0] for row in self._query("SELECT key FROM cache")])
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM cache")[0][0]
+
+    def import_json(self, json_path: str):
+        """Bulk-inserts the entries of a JSON cache file written by earlier versions of this script."""
+        with open(json_path, 'r') as f:
+            entries = json.load(f)
+        now = time.time()
+        # Insert everything in one transaction rather than committing each row.
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                                   [(key, value, now) for key, value in entries.items()])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Bump PROMPT_VERSION whenever SYSTEM_INSTRUCTION changes in a way that should
+# regenerate the cached descriptions. Cache keys are f"{PROMPT_VERSION}:{ticker}",
+# so wording tweaks that keep the version do not invalidate the cache.
+PROMPT_VERSION = "v1"
+SYSTEM_INSTRUCTION = (
+    "As a financial analyst, provide a concise, one-sentence summary for the company with the given stock ticker. "
+    "Then, provide 3 concise reasons to invest and 3 reasons not to invest with solid justification. "
+    "Use only <p> <b> <ul> <li> and <br> HTML tags for formatting. "
+    "Use ASCII characters only, no emojis or special characters. "
+    "Return the response without any markdown code fences or triple backticks."
+)
+
+def _cache_key(ticker: str) -> str:
+    """
+    Returns the cache key for a ticker's description under the current prompt version.
+
+    The ticker is normalized so that trivial spelling variations of the same symbol
+    (e.g. 'brk.b', 'BRK-B' and 'BRKB') share one cache entry.
+    """
+    normalized = ''.join(c for c in ticker.strip().upper() if c not in '.-/ ')
+    return f"{PROMPT_VERSION}:{normalized}"
+
+def _legacy_cache_key(ticker: str) -> str:
+    """Returns the key used before versioning: a SHA-256 hash of the full v1 prompt."""
     prompt = (
         f"As a financial analyst, provide a concise, one-sentence summary for the company with the stock ticker {ticker}. "
         "Then, provide 3 concise reasons to invest and 3 reasons not to invest with solid justification. "
@@ -32,12 +140,69 @@ def get_company_description(ticker: str, cache: dict) -> str:
         "Use ASCII characters only, no emojis or special characters. "
         "Return the response without any markdown code fences or triple backticks."
     )
-    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+def migrate_cache(cache: SqliteCache | dict, tickers: list[str]):
+    """
+    Moves descriptions cached under the old prompt-hash keys to the versioned keys.
+
+    Legacy entries are re-keyed when their ticker (spelled exactly as it was when the
+    entry was created) is known.
+
+    Args:
+        cache (SqliteCache | dict): The cache, modified in-place.
+        tickers (list[str]): The tickers whose legacy entries should be re-keyed.
+    """
+    for ticker in tickers:
+        legacy_key = _legacy_cache_key(ticker)
+        if legacy_key in cache and _cache_key(ticker) not in cache:
+            cache[_cache_key(ticker)] = cache[legacy_key]
+            del cache[legacy_key]
+
+def prune_cache(cache: SqliteCache | dict):
+    """
+    Drops entries that are neither versioned keys nor legacy prompt hashes.
+
+    Only a cache imported from an old JSON file can hold such keys, so this walks
+    every key and is meant to run once, right after the import.
+
+    Args:
+        cache (SqliteCache | dict): The cache, modified in-place.
+    """
+    for key in list(cache):
+        is_legacy_hash = len(key) == 64 and all(c in '0123456789abcdef' for c in key)
+        if ':' not in key and not is_legacy_hash:
+            del cache[key]
+
+@functools.lru_cache(maxsize=None)
+def _get_gemini_model() -> genai.GenerativeModel:
+    """Configures the Gemini client once and returns the shared model instance."""
+    api_key = os.getenv("GOOGLE_API_KEY")
+    assert api_key, "GOOGLE_API_KEY environment variable must be set."
+
+    genai.configure(api_key=api_key)
+    # The fixed instructions go in the system instruction so only the ticker varies per request.
+    return genai.GenerativeModel('gemini-1.5-flash', system_instruction=SYSTEM_INSTRUCTION)
+
+def get_company_description(ticker: str, cache: SqliteCache | dict) -> str:
+    """
+    Generates a company description using the Gemini API, with local caching.
+    The cache key combines PROMPT_VERSION and the ticker, so bumping the version
+    invalidates the cache.
+
+    Args:
+        ticker (str): The stock ticker of the company.
+        cache (SqliteCache | dict): A dict-like cache used to avoid repeated API calls.
+
+    Returns:
+        str: A one-paragraph description of the company's business.
+    """
+    cache_key = _cache_key(ticker)
 
     # 1. Check for the description in the cache first
-    if prompt_hash in cache:
-        print(f"  -> Found cached description for {ticker} (hash: {prompt_hash[:7]}...).")
-        return cache[prompt_hash]
+    if cache_key in cache:
+        print(f"  -> Found cached description for {ticker} (key: {cache_key}).")
+        return cache[cache_key]
 
     # 2. If not in cache, proceed with API call
     fallback_description = (
@@ -45,28 +210,83 @@ def get_company_description(ticker: str, cache: dict) -> str:
         "within its respective industry, and its performance is a subject of market analysis."
     )
 
-    api_key = os.getenv("GOOGLE_API_KEY")
-    assert api_key, "GOOGLE_API_KEY environment variable must be set."
+    model = _get_gemini_model()
 
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-
-        # The prompt is already defined above
-        response = model.generate_content(prompt)
+        _gemini_bucket.acquire()
+        response = model.generate_content(f"Stock ticker: {ticker}")
         description = response.text.strip()
-        time.sleep(4)  # Add a 4-second delay here
 
         # 3. Store the new description in the cache for future use
-        cache[prompt_hash] = description
+        cache[cache_key] = description
         return description
 
     except Exception as e:
         print(f"Error calling Gemini API for {ticker}: {e}")
         return fallback_description
 
+def prefetch_descriptions(tickers: list[str], cache: SqliteCache | dict, max_workers: int = 8) -> dict:
+    """
+    Generates the company descriptions for all tickers concurrently.
+    Cached descriptions are returned immediately; the remaining ones are requested
+    from the Gemini API in parallel, limited only by the per-minute quota.
+
+    Args:
+        tickers (list[str]): The stock tickers to describe.
+        cache (SqliteCache | dict): The cache to pass to the description generator.
+        max_workers (int): The maximum number of concurrent API calls.
+
+    Returns:
+        dict: A dictionary mapping each ticker to its description.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        descriptions = executor.map(lambda ticker: get_company_description(ticker, cache), tickers)
+        return dict(zip(tickers, descriptions))
+
 # --- PDF Generation ---
 
+# Plot images are embedded 190 mm wide; this resolution is enough for print.
+REPORT_IMAGE_WIDTH_MM = 190
+REPORT_IMAGE_DPI = 150
+REPORT_IMAGE_JPEG_QUALITY = 80
+
+def prepare_report_image(image_path: str) -> str:
+    """
+    Returns a JPEG copy of a plot image downscaled to the size it is embedded at in the report.
+
+    The copy is flattened onto a white background, which removes the alpha channel
+    FPDF would otherwise embed as a separate mask, and JPEG data is embedded by FPDF
+    without re-encoding. It is cached in a '.resized' folder next to the original
+    and regenerated only when the original is newer.
+
+    Args:
+        image_path (str): The path to the original plot image.
+
+    Returns:
+        str: The path to the prepared image, or the original path if it could not be processed.
+    """
+    target_width = round(REPORT_IMAGE_WIDTH_MM / 25.4 * REPORT_IMAGE_DPI)
+    cache_dir = os.path.join(os.path.dirname(image_path), '.resized')
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    resized_path = os.path.join(cache_dir, f"{base_name}_{target_width}w_q{REPORT_IMAGE_JPEG_QUALITY}.jpg")
+    if os.path.exists(resized_path) and os.path.getmtime(resized_path) >= os.path.getmtime(image_path):
+        return resized_path
+
+    try:
+        with Image.open(image_path) as image:
+            image = image.convert('RGBA')
+            if image.width > target_width:
+                target_height = round(image.height * target_width / image.width)
+                image = image.resize((target_width, target_height), Image.LANCZOS)
+            flattened = Image.new('RGB', image.size, 'white')
+            flattened.paste(image, mask=image.getchannel('A'))
+            os.makedirs(cache_dir, exist_ok=True)
+            flattened.save(resized_path, 'JPEG', quality=REPORT_IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+        return resized_path
+    except (IOError, ValueError) as e:
+        print(f"Warning: Could not prepare image '{image_path}' ({e}). Embedding the original.")
+        return image_path
+
 class PDF(FPDF):
     """Custom PDF class to include a page number footer."""
 
@@ -112,14 +332,14 @@ def add_cover_page(pdf: PDF, title: str, num_reports: int):
     pdf.set_font('Helvetica', '', 12)
     pdf.cell(0, 10, f"This document provides a detailed analysis of the top {num_reports} performing stocks.", 0, 1, 'C')
 
-def add_report_page(pdf: PDF, stock_data: dict, cache: dict):
+def add_report_page(pdf: PDF, stock_data: dict, description_html: str):
     """
     Adds a new page to an existing PDF object with the analysis for one stock.
 
     Args:
         pdf (PDF): The FPDF object to which the page will be added.
         stock_data (dict): A dictionary containing info like ticker, score, and figure path.
-        cache (dict): The cache dictionary to pass to the description generator.
+        description_html (str): The HTML company description generated by the LLM.
 
     Returns:
         None
@@ -132,9 +352,6 @@ def add_report_page(pdf: PDF, stock_data: dict, cache: dict):
         print(f"Warning: Figure not found for {ticker} at '{image_path}'. Skipping.")
         return
 
-    # Get company description from LLM (with caching)
-    description_html = get_company_description(ticker, cache)
-
     # --- Add Page and Content ---
     pdf.add_page()
 
@@ -158,16 +375,17 @@ def add_report_page(pdf: PDF, stock_data: dict, cache: dict):
 
     # Plot Image
     # A4 page width is 210mm. With 10mm margins, usable width is 190mm.
-    pdf.image(image_path, w=190)
+    pdf.image(prepare_report_image(image_path), w=REPORT_IMAGE_WIDTH_MM)
 
 def main():
     """Main function to generate a single combined PDF report from a JSON results file."""
     parser = argparse.ArgumentParser(description="Generate a single combined PDF report from a JSON results file.")
     parser.add_argument("--input-json", default="scoring_results.json", help="Path to the JSON file containing scoring results.")
     parser.add_argument("--output-dir", default="reports", help="Directory to save the generated PDF files.")
-    parser.add_argument("--cache-file", default=".gemini_cache.json", help="Path to the cache file for LLM responses.")
+    parser.add_argument("--cache-file", default=".gemini_cache.db", help="Path to the SQLite cache file for LLM responses.")
     parser.add_argument("--filename", default="Combined_Stock_Report.pdf", help="Base filename for the combined PDF report. A timestamp will be appended.")
     parser.add_argument("--top", type=int, help="Limit the report to the top N tickers from the JSON file.")
+    parser.add_argument("--workers", type=int, default=8, help="Number of company descriptions to generate concurrently.")
     args = parser.parse_args()
 
     if not os.path.exists(args.input_json):
@@ -176,13 +394,22 @@ def main():
         return
 
     # --- Cache Loading ---
-    llm_cache = {}
-    if os.path.exists(args.cache_file):
+    try:
+        llm_cache = SqliteCache(args.cache_file)
+    except sqlite3.Error as e:
+        print(f"Warning: Could not open cache file at '{args.cache_file}' ({e}). Starting with an in-memory cache.")
+        llm_cache = {}
+
+    # One-off migration from the JSON cache used by earlier versions.
+    legacy_json_cache = os.path.splitext(args.cache_file)[0] + '.json'
+    if isinstance(llm_cache, SqliteCache) and len(llm_cache) == 0 and os.path.exists(legacy_json_cache):
         try:
-            with open(args.cache_file, 'r') as f:
-                llm_cache = json.load(f)
-        except (json.JSONDecodeError, IOError):
-            print(f"Warning: Could not read or parse cache file at '{args.cache_file}'. Starting with an empty cache.")
+            llm_cache.import_json(legacy_json_cache)
+            prune_cache(llm_cache)
+            print(f"--- Imported {len(llm_cache)} cached responses from '{legacy_json_cache}' ---")
+        except (json.JSONDecodeError, IOError, sqlite3.Error):
+            print(f"Warning: Could not import the legacy cache file at '{legacy_json_cache}'.")
+
     try:
         with open(args.input_json, 'r') as f:
             report_data = json.load(f)
@@ -199,6 +426,18 @@ def main():
         report_data = report_data[:args.top]
         print(f"--- Limiting report to the top {len(report_data)} tickers ---")
 
+    migrate_cache(llm_cache, [d.get('ticker', 'N/A').upper() for d in report_data])
+
+    # --- Company Descriptions ---
+    # Generate all descriptions up front so the API calls overlap instead of
+    # running one at a time while the PDF is assembled.
+    tickers_with_figures = [
+        d.get('ticker', 'N/A').upper() for d in report_data
+        if d.get('figure') and os.path.exists(d['figure'])
+    ]
+    print(f"--- Generating company descriptions for {len(tickers_with_figures)} tickers ---")
+    descriptions = prefetch_descriptions(tickers_with_figures, llm_cache, max_workers=args.workers)
+
     # --- PDF Setup ---
     os.makedirs(args.output_dir, exist_ok=True)
     pdf = PDF('P', 'mm', 'A4')  # Create a single PDF object
@@ -212,7 +451,7 @@ def main():
         ticker = stock_data.get('ticker', 'N/A')
         print(f"  [{rank}/{len(report_data)}] Adding report for {ticker}...")
 
-        add_report_page(pdf, stock_data, llm_cache)
+        add_report_page(pdf, stock_data, descriptions.get(ticker.upper(), ''))
 
     # --- Save the final combined PDF ---
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -222,13 +461,8 @@ def main():
     pdf.output(output_filepath)
     print(f"\n--- Report successfully saved to: {os.path.abspath(output_filepath)} ---")
 
-    # --- Cache Saving ---
-    try:
-        with open(args.cache_file, 'w') as f:
-            json.dump(llm_cache, f, indent=4)
-        print(f"--- LLM cache updated and saved to: {os.path.abspath(args.cache_file)} ---")
-    except IOError as e:
-        print(f"Error saving LLM cache: {e}")
+    if isinstance(llm_cache, SqliteCache):
+        llm_cache.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,19 +1,97 @@
 import os
 import argparse
 import json
+import numpy as np
 import pandas as pd
-import glob
 import matplotlib.pyplot as plt
-from scoring import compute_stock_score
-from plot_analysis import run_and_plot_analysis
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from nasdaq_downloader import filename_date_range, latest_data_files, read_price_history
+from scoring import score_universe
+from plot_analysis import plot_many
+
+# Weights passed to score_universe for every stock.
+SCORE_WEIGHTS = {
+    'annualization_factor': 252,
+    'ann_return_weight': 1.0,
+    'max_dd_weight': -2.0,
+    'slope_to_noise_weight': 4.0,
+}
+
+# Years of closing prices, counted back from the last date, that each stock is scored on.
+SCORING_WINDOW_YEARS = 5
+
+# Bump whenever the scoring code changes, so scores cached by an older version are recomputed.
+SCORING_VERSION = 1
+
+# Part of every score cache key. Changing the version, window or weights invalidates the cache.
+_SCORE_CACHE_TAG = f"v{SCORING_VERSION}:w{SCORING_WINDOW_YEARS}:" + ",".join(
+    f"{name}={value}" for name, value in sorted(SCORE_WEIGHTS.items()))
+
+def _load_scoring_window(filepath: str, min_years_history: int) -> np.ndarray | None:
+    """
+    Reads one stock CSV and returns the closing prices used for scoring.
+
+    Args:
+        filepath (str): The path to the stock data CSV.
+        min_years_history (int): The minimum years of data required for a stock to be scored.
+
+    Returns:
+        np.ndarray | None: The last SCORING_WINDOW_YEARS years of closing prices, or None if the stock was skipped.
+    """
+    filename = os.path.basename(filepath)
+
+    try:
+        df = read_price_history(filepath, columns=['Close'])
+        return _scoring_window(df.index.values, df['Close'].to_numpy(), min_years_history)
+    except Exception as e:
+        print(f"Error processing {filename}: {e}")
+        return None
+
+def _scoring_window(dates: np.ndarray, closes: np.ndarray, min_years_history: int) -> np.ndarray | None:
+    """
+    Selects the closing prices used for scoring from one stock's sorted price history.
+
+    Args:
+        dates (np.ndarray): The sorted trading dates.
+        closes (np.ndarray): The closing price on each date.
+        min_years_history (int): The minimum years of data required for a stock to be scored.
+
+    Returns:
+        np.ndarray | None: The last SCORING_WINDOW_YEARS years of closing prices, or None if the stock was skipped.
+    """
+    required_days = min_years_history * 365.25
+    if closes.size == 0 or (dates[-1] - dates[0]) // np.timedelta64(1, 'D') < required_days:
+        return None
+
+    # Only use the last SCORING_WINDOW_YEARS years of data for scoring. The dates are sorted, so a
+    # binary search gives the start position and the slice is a view of the array.
+    cutoff = np.datetime64(pd.Timestamp(dates[-1]) - pd.DateOffset(years=SCORING_WINDOW_YEARS))
+    start_idx = np.searchsorted(dates, cutoff)
+    closes = closes[start_idx:]
+
+    # Ensure there's still data to score after slicing
+    if closes.size == 0:
+        return None
+
+    return closes
 
-def score_stocks_in_folder(data_folder: str = 'data/', min_years_history: int = 5) -> dict:
+def score_stocks_in_folder(data_folder: str = 'data/', min_years_history: int = 5,
+                          cache_file: str | None = '.score_cache.json') -> dict:
     """
-    Reads all stock CSVs from a folder, computes their scores, and returns them.
+    Reads all stock CSVs from a folder in parallel worker processes, computes
+    their scores in one vectorised batch, and returns them.
+
+    Scores are cached by filename and modification time, so only files that were
+    added or changed since the last run are read and scored again. The cache keys
+    also include the scoring version, window and weights, so changing any of them
+    rescores every file.
 
     Args:
         data_folder (str): The path to the folder containing stock data CSVs.
         min_years_history (int): The minimum years of data required for a stock to be scored.
+        cache_file (str | None): The JSON file used to cache scores between runs. None disables caching.
 
     Returns:
         dict: A dictionary mapping stock tickers to their computed scores.
@@ -23,53 +101,96 @@ def score_stocks_in_folder(data_folder: str = 'data/', min_years_history: int =
         print(f"Error: Data folder '{data_folder}' not found.")
         return scores
 
+    score_cache = {}
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r') as f:
+                score_cache = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            print(f"Warning: Could not read score cache at '{cache_file}'. Rescoring all files.")
+
+    # Entries written with other scoring settings can never match again, so drop them.
+    current_cache = {key: value for key, value in score_cache.items() if key.endswith(f":{_SCORE_CACHE_TAG}")}
+    cache_pruned = len(current_cache) != len(score_cache)
+    score_cache = current_cache
+
     print(f"Scoring stocks from '{os.path.abspath(data_folder)}'...")
-    for filename in sorted(os.listdir(data_folder)):
-        if not filename.lower().endswith('.csv'):
+    stale = []  # (ticker, filepath, cache key, mtime) for files that need scoring
+    cache_updated = cache_pruned
+    # Only the newest file of each ticker is scored, so directory order doesn't matter.
+    for ticker, entry in latest_data_files(data_folder).items():
+        filepath = entry.path
+        mtime = entry.stat().st_mtime
+        key = f"{entry.name}:{min_years_history}:{_SCORE_CACHE_TAG}"
+
+        # Skipped files are cached with a score of None so they are not re-read either.
+        cached = score_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            if cached[1] is not None:
+                scores[ticker] = cached[1]
             continue
 
-        ticker = filename.split('_')[0]
-        filepath = os.path.join(data_folder, filename)
+        # The file's data can't span more than the range in its name, so files whose
+        # name already shows too little history are skipped without being parsed.
+        date_range = filename_date_range(entry.name)
+        if date_range is not None and (date_range[1] - date_range[0]).days < min_years_history * 365.25:
+            score_cache[key] = [mtime, None]
+            cache_updated = True
+            continue
 
+        stale.append((ticker, filepath, key, mtime))
+
+    cache_updated = cache_updated or bool(stale)
+    if stale:
+        print(f"Scoring {len(stale)} new or modified files ({len(scores)} scores loaded from cache)...")
+        # Parsing is CPU-bound pandas work, so spread it across processes.
+        # Batch several files per task to amortize the inter-process overhead.
+        workers = os.cpu_count() or 1
+        chunksize = max(1, len(stale) // (4 * workers))
+        filepaths = [filepath for _, filepath, _, _ in stale]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            windows = list(executor.map(partial(_load_scoring_window, min_years_history=min_years_history),
+                                        filepaths, chunksize=chunksize))
+
+        # Score all loaded windows together rather than one ticker at a time.
+        new_scores = score_universe(
+            {key: window for (_, _, key, _), window in zip(stale, windows) if window is not None},
+            **SCORE_WEIGHTS,
+        )
+        for ticker, _, key, mtime in stale:
+            score = new_scores.get(key)
+            score_cache[key] = [mtime, score]
+            if score is not None:
+                scores[ticker] = score
+
+    if cache_file and cache_updated:
         try:
-            df = pd.read_csv(filepath, index_col='Date', parse_dates=True)
-            required_days = min_years_history * 365.25
-            if df.empty or (df.index.max() - df.index.min()).days < required_days:
-                continue
-
-            # Slice the DataFrame to only use the last 5 years of data for scoring
-            end_date = df.index.max()
-            start_date = end_date - pd.DateOffset(years=5)
-            scoring_df = df.loc[start_date:]
-
-            # Ensure there's still data to score after slicing
-            if scoring_df.empty:
-                continue
-
-            score = compute_stock_score(scoring_df['Close'], annualization_factor=252, 
-                                        ann_return_weight=1.0,
-                                        max_dd_weight=-2.0,
-                                        slope_to_noise_weight=4.0)
-            scores[ticker] = score
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
+            with open(cache_file, 'w') as f:
+                json.dump(score_cache, f)
+        except IOError as e:
+            print(f"Warning: Could not save score cache: {e}")
 
     return scores
 
-def get_ranked_stocks(min_years: int, top_n: int) -> list[dict]:
+def get_ranked_stocks(min_years: int, top_n: int, universe_file: str | None = None) -> list[dict]:
     """
     Scores stocks by calling the scoring function directly and returns the top N.
 
     Args:
         min_years (int): The minimum years of history for a stock to be scored.
         top_n (int): The number of top stocks to return from the ranking.
+        universe_file (str | None): Score from this universe file, rebuilding it first if any
+                                    CSV is newer. None scores the CSVs one file at a time.
 
     Returns:
         A list of dictionaries, each containing ranking, ticker, and score.
     """
     print("--- Running Stock Scoring ---")
     # Call the local scoring function
-    all_scores = score_stocks_in_folder(data_folder='data', min_years_history=min_years)
+    if universe_file and (universe_is_current(universe_file, 'data') or build_universe('data', universe_file)):
+        all_scores = score_universe_file(universe_file, min_years_history=min_years)
+    else:
+        all_scores = score_stocks_in_folder(data_folder='data', min_years_history=min_years)
 
     if not all_scores:
         print("Warning: No stocks were scored. Exiting.")
@@ -99,9 +220,111 @@ def get_ranked_stocks(min_years: int, top_n: int) -> list[dict]:
 
     return ranked_stocks_data
 
+def _build_data_file_map(data_folder: str) -> dict[str, str]:
+    """
+    Maps each ticker to its newest data file with a single directory listing.
+
+    Args:
+        data_folder (str): The path to the folder containing stock data CSVs.
+
+    Returns:
+        dict[str, str]: A dictionary mapping upper-case tickers to CSV file paths.
+    """
+    return {ticker: entry.path for ticker, entry in sorted(latest_data_files(data_folder).items())}
+
+def build_universe(data_folder: str = 'data/', out_path: str = 'universe.parquet') -> bool:
+    """
+    Packs the closing prices of every stock in a folder into a single Parquet file.
+
+    The table has one row per (ticker, Date) with the rows of each ticker stored
+    together, so scoring the whole universe is one columnar read instead of one
+    file open and parse per ticker.
+
+    Args:
+        data_folder (str): The path to the folder containing stock data CSVs.
+        out_path (str): The path of the Parquet file to write.
+
+    Returns:
+        bool: True if the universe file was written.
+    """
+    if not os.path.isdir(data_folder):
+        print(f"Error: Data folder '{data_folder}' not found.")
+        return False
+
+    print(f"Building universe file '{out_path}' from '{os.path.abspath(data_folder)}'...")
+    frames = []
+    for ticker, filepath in _build_data_file_map(data_folder).items():
+        try:
+            df = read_price_history(filepath, columns=['Close'])
+        except Exception as e:
+            print(f"Error processing {os.path.basename(filepath)}: {e}")
+            continue
+        frames.append(pd.DataFrame({'ticker': ticker, 'Date': df.index.values, 'Close': df['Close'].to_numpy()}))
+
+    if not frames:
+        print("Warning: No price data found for the universe file.")
+        return False
+
+    universe = pd.concat(frames, ignore_index=True)
+    # Stored as a dictionary-encoded column, so each ticker name is written once.
+    universe['ticker'] = universe['ticker'].astype('category')
+    tmp_path = out_path + '.tmp'
+    try:
+        universe.to_parquet(tmp_path, index=False, compression='zstd')
+        os.replace(tmp_path, out_path)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not write universe file '{out_path}': {e}")
+        return False
+    print(f"Saved {len(frames)} tickers to '{out_path}'.")
+    return True
+
+def universe_is_current(universe_path: str, data_folder: str = 'data/') -> bool:
+    """Whether the universe file exists and is newer than every stock CSV in the folder."""
+    if not os.path.exists(universe_path) or not os.path.isdir(data_folder):
+        return False
+    universe_mtime = os.path.getmtime(universe_path)
+    with os.scandir(data_folder) as it:
+        return all(e.stat().st_mtime <= universe_mtime for e in it if e.name.lower().endswith('.csv'))
+
+def score_universe_file(universe_path: str, min_years_history: int = 5) -> dict:
+    """
+    Scores every stock in a universe file written by build_universe.
+
+    Args:
+        universe_path (str): The path of the universe Parquet file.
+        min_years_history (int): The minimum years of data required for a stock to be scored.
+
+    Returns:
+        dict: A dictionary mapping stock tickers to their computed scores.
+    """
+    print(f"Scoring stocks from universe file '{universe_path}'...")
+    universe = pd.read_parquet(universe_path, columns=['ticker', 'Date', 'Close'])
+    if universe.empty:
+        return {}
+
+    # Each ticker's rows are contiguous, so its prices are a view between two boundaries.
+    codes = universe['ticker'].cat.codes.to_numpy()
+    starts = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.concatenate(([0], starts))
+    ends = np.append(starts[1:], codes.size)
+    names = universe['ticker'].cat.categories[codes[starts]]
+    dates = universe['Date'].to_numpy()
+    closes = universe['Close'].to_numpy()
+
+    windows = {}
+    for ticker, start, end in zip(names, starts, ends):
+        window = _scoring_window(dates[start:end], closes[start:end], min_years_history)
+        if window is not None:
+            windows[ticker] = window
+
+    return score_universe(
+        windows,
+        **SCORE_WEIGHTS,
+    )
+
 def generate_analysis_plots(ranked_stocks_data: list[dict], output_dir: str):
     """
-    Generates and saves analysis plots for a list of ranked stocks.
+    Generates and saves analysis plots for a list of ranked stocks in parallel worker processes.
     This function modifies the dictionaries in the list in-place to add the figure path.
 
     Args:
@@ -111,23 +334,20 @@ def generate_analysis_plots(ranked_stocks_data: list[dict], output_dir: str):
     print(f"\n--- Generating Analysis Plots in '{os.path.abspath(output_dir)}' ---")
     os.makedirs(output_dir, exist_ok=True)
 
+    # Rendering is CPU-bound, and each process gets its own matplotlib state. Every
+    # worker plots one chunk of tickers so it can reuse a single figure for all of them.
+    tickers = [stock_data['ticker'] for stock_data in ranked_stocks_data]
+    workers = max(1, min(os.cpu_count() or 1, len(tickers)))
+    size = max(1, -(-len(tickers) // workers))
+    chunks = [tickers[i:i + size] for i in range(0, len(tickers), size)]
+    figures = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_figures in executor.map(partial(plot_many, output_dir=output_dir), chunks):
+            figures.update(chunk_figures)
+
     for stock_data in ranked_stocks_data:
-        rank = stock_data['ranking']
-        ticker = stock_data['ticker']
-
-        print(f"[{rank}/{len(ranked_stocks_data)}] Generating plot for {ticker}...")
-        # Format with leading zeros for correct file sorting (e.g., 01-AAPL.png)
-        output_filename = f"{ticker}.png"
-        output_filepath = os.path.join(output_dir, output_filename)
-        
-        try:
-            # Directly call the plotting function from the other script
-            run_and_plot_analysis(ticker=ticker, output_path=output_filepath)
-            # Add the absolute path of the generated figure to the dictionary
-            stock_data['figure'] = os.path.abspath(output_filepath)
-        except Exception as e:
-            print(f"  -> Error generating plot for {ticker}: {e}")
-            stock_data['figure'] = None # Indicate failure
+        # Add the absolute path of the generated figure to the dictionary
+        stock_data['figure'] = figures.get(stock_data['ticker'])
 
 def plot_normalized_prices(top_stocks: list, data_folder: str = 'data/'):
     """
@@ -142,16 +362,14 @@ def plot_normalized_prices(top_stocks: list, data_folder: str = 'data/'):
 
     print(f"\n--- Plotting normalized prices for top {len(top_stocks)} stocks... ---")
 
+    file_map = _build_data_file_map(data_folder)
     for ticker, score in top_stocks:
-        search_pattern = os.path.join(data_folder, f"{ticker.upper()}_*_to_*.csv")
-        matching_files = glob.glob(search_pattern)
-
-        if not matching_files:
+        filepath = file_map.get(ticker.upper())
+        if not filepath:
             print(f"Warning: Could not find data file for ticker {ticker}. Skipping plot.")
             continue
 
-        filepath = matching_files[0]
-        df = pd.read_csv(filepath, index_col='Date', parse_dates=True)
+        df = read_price_history(filepath, columns=['Close'])
         normalized_price = (df['Close'] / df['Close'].iloc[0]) * 100
         ax.plot(normalized_price, label=f"{ticker} (Score: {score:.2f})", alpha=0.8)
 
@@ -168,10 +386,11 @@ if __name__ == "__main__":
     parser.add_argument("--min-years", type=int, default=5, help="Minimum years of history required for scoring.")
     parser.add_argument("--outdir", default="plots", help="Directory to save the generated individual plot images.")
     parser.add_argument("--json-output", default="scoring_results.json", help="Path to save the output results in JSON format.")
+    parser.add_argument("--universe", default=None, help="Score from this single Parquet file of all closing prices (e.g. universe.parquet), rebuilding it when the data changes.")
     parser.add_argument("--plot", action="store_true", help="Generate a comparative plot of the top N stocks' normalized price performance.")
     args = parser.parse_args()
 
-    top_stocks_data = get_ranked_stocks(min_years=args.min_years, top_n=args.top)
+    top_stocks_data = get_ranked_stocks(min_years=args.min_years, top_n=args.top, universe_file=args.universe)
     if top_stocks_data:
         generate_analysis_plots(top_stocks_data, output_dir=args.outdir)
 
@@ -1,22 +1,85 @@
 import requests
+import numpy as np
 import pandas as pd
 import os
 import argparse
-from datetime import datetime
+import functools
+import importlib.util
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def download_nasdaq_data(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+# Parquet copies of the price CSVs need pyarrow; without it only the CSVs are used.
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Column types of the price CSVs written by this module. Passing them to
+# read_csv skips pandas' per-column type inference.
+PRICE_DTYPES = {'Open': 'float64', 'High': 'float64', 'Low': 'float64', 'Close': 'float64', 'Volume': 'int64'}
+
+# How many times a ticker is retried after being rate limited before giving up.
+MAX_RATE_LIMIT_RETRIES = 5
+
+# Directory holding Parquet copies of downloads whose date range has ended.
+DOWNLOAD_CACHE_DIR = "cache"
+
+# How many downloads are memoized in-process. Only repeated lookups of the same
+# range benefit (e.g. replotting a ticker), so bulk downloads must not fill memory.
+DOWNLOAD_MEMO_SIZE = 8
+
+_memo: dict[tuple[str, str, str], pd.DataFrame] = {}
+_memo_lock = threading.Lock()
+
+# Translation table that removes the '$' and ',' formatting from Nasdaq's numbers.
+_NUMBER_FORMATTING = str.maketrans('', '', '$,')
+
+class RateLimitError(Exception):
+    """Raised when the Nasdaq API rejects a request with HTTP 429 (Too Many Requests)."""
+
+    def __init__(self, ticker: str, retry_after: float | None = None):
+        super().__init__(f"Rate limited while downloading {ticker}")
+        self.retry_after = retry_after
+
+def create_session(pool_size: int = 10) -> requests.Session:
     """
-    Downloads daily historical stock data from nasdaq.com for a given ticker.
+    Creates a requests session with connection pooling and automatic retries.
+
+    Sharing one session across downloads keeps connections to the Nasdaq API
+    alive, so the TLS handshake is paid once per connection instead of once per ticker.
 
     Args:
-        ticker (str): The stock ticker symbol (e.g., 'AAPL').
-        start_date (str): The start date in 'YYYY-MM-DD' format.
-        end_date (str): The end date in 'YYYY-MM-DD' format.
+        pool_size (int): The maximum number of pooled connections, typically the number of worker threads.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the historical data (Date, Close,
-                      Volume, Open, High, Low), or None if an error occurs.
+        requests.Session: The configured session.
     """
+    session = requests.Session()
+    # Nasdaq API requires a user-agent header to mimic a browser
+    session.headers.update({
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+        "Accept-Encoding": "gzip, deflate",
+    })
+    # Transient server errors are retried by urllib3. 429 is deliberately left out and
+    # Retry-After is not honoured, so that rate limits surface as RateLimitError and the
+    # caller can slow down all of its workers, not just the one request.
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504],
+                                            respect_retry_after_header=False))
+    session.mount('https://', adapter)
+    return session
+
+# Size of the shared session's connection pool.
+SESSION_POOL_SIZE = 16
+
+# Session shared by every download that is not given its own, so repeated calls
+# reuse kept-alive connections instead of opening a new one per ticker.
+_SESSION = create_session(pool_size=SESSION_POOL_SIZE)
+
+def _fetch_nasdaq_data(ticker: str, start_date: str, end_date: str,
+                       session: requests.Session | None = None) -> pd.DataFrame:
+    """Requests the historical data from the Nasdaq API, bypassing the download cache."""
     # Nasdaq uses a large limit to return all data in the date range in one request
     # We set a very large number to ensure we get all the data.
     limit = 99999
@@ -31,43 +94,33 @@ def download_nasdaq_data(ticker: str, start_date: str, end_date: str) -> pd.Data
         "limit": limit,
     }
 
-    # Nasdaq API requires a user-agent header to mimic a browser
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-
     try:
         print(f"Requesting data for {ticker} from {start_date} to {end_date}...")
-        response = requests.get(url, headers=headers, params=params, timeout=15)
+        response = (session or _SESSION).get(url, params=params, timeout=15)
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "")
+            raise RateLimitError(ticker, float(retry_after) if retry_after.isdigit() else None)
         response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
 
         data = response.json()
 
         if data['data'] and data['data']['tradesTable']:
             rows = data['data']['tradesTable']['rows']
-            df = pd.DataFrame(rows)
+            n = len(rows)
 
             # --- Data Cleaning and Formatting ---
-            # Rename columns to a more standard format
-            df = df.rename(columns={
-                'date': 'Date',
-                'close': 'Close',
-                'volume': 'Volume',
-                'open': 'Open',
-                'high': 'High',
-                'low': 'Low'
-            })
-
-            # Remove the dollar sign and commas, then convert to numeric types
-            for col in ['Close', 'Open', 'High', 'Low']:
-                df[col] = df[col].str.replace(r'[$,]', '', regex=True).astype(float)
-            df['Volume'] = df['Volume'].str.replace(',', '', regex=True).astype(int)
-
-            # Convert date column to datetime objects and format it
-            df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%Y')
-            
-            # Reorder columns and sort by date
-            df = df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']].sort_values(by='Date').reset_index(drop=True)
+            # Strip the dollar signs and commas with str.translate and parse each
+            # column straight into a typed array, instead of cleaning object columns.
+            columns = {'Date': pd.to_datetime([row['date'] for row in rows], format='%m/%d/%Y', cache=True)}
+            for col in ['Open', 'High', 'Low', 'Close']:
+                columns[col] = np.fromiter((row[col.lower()].translate(_NUMBER_FORMATTING) for row in rows),
+                                           dtype=np.float64, count=n)
+            columns['Volume'] = np.fromiter((row['volume'].translate(_NUMBER_FORMATTING) for row in rows),
+                                            dtype=np.int64, count=n)
+            df = pd.DataFrame(columns)
+
+            # Sort by date
+            df = df.sort_values(by='Date').reset_index(drop=True)
             
             return df
         else:
@@ -78,38 +131,418 @@ def download_nasdaq_data(ticker: str, start_date: str, end_date: str) -> pd.Data
         print(f"An error occurred: {e}")
         return None
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description="Download historical stock data from Nasdaq.")
-    parser.add_argument("ticker", help="Stock ticker symbol (e.g., AAPL, GOOG). Note: Nasdaq.com typically provides about 10 years of historical data.")
-    parser.add_argument("--start", default=None, help="Start date in YYYY-MM-DD format. If not provided, downloads from the earliest available date.")
-    parser.add_argument("--end", default=datetime.now().strftime('%Y-%m-%d'), help="End date in YYYY-MM-DD format.")
-    parser.add_argument("--outdir", default="data", help="The directory to save the output CSV file. Defaults to 'data'.")
-    args = parser.parse_args()
+@functools.lru_cache(maxsize=None)
+def _ensure_dir(path: str):
+    """Creates a directory if needed. Each path is only checked once per process."""
+    os.makedirs(path, exist_ok=True)
+
+def _download_cache_path(ticker: str, start_date: str, end_date: str) -> str:
+    """Returns the path of the on-disk copy of a download."""
+    return os.path.join(DOWNLOAD_CACHE_DIR, f"{ticker}_{start_date}_{end_date}.parquet")
+
+def _range_is_closed(end_date: str, as_of: datetime) -> bool:
+    """
+    Whether data fetched at `as_of` (local time) already covers every trading day up to `end_date`.
+
+    Two days are required rather than one, so that even far east of New York the
+    local clock has passed the US market close on `end_date`.
+    """
+    return as_of >= datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=2)
+
+def _read_download_cache(ticker: str, start_date: str, end_date: str) -> pd.DataFrame | None:
+    """Reads a cached download from disk, or returns None if there is no usable copy."""
+    if not HAS_PYARROW:
+        return None
+    path = _download_cache_path(ticker, start_date, end_date)
+    try:
+        # A copy fetched before the range ended may be missing the last days.
+        if not _range_is_closed(end_date, datetime.fromtimestamp(os.path.getmtime(path))):
+            return None
+        return pd.read_parquet(path)
+    except (OSError, ValueError):
+        return None
+
+def _write_download_cache(df: pd.DataFrame, ticker: str, start_date: str, end_date: str):
+    """Saves a download to disk once its date range has ended, so the copy never goes stale."""
+    if not HAS_PYARROW or not _range_is_closed(end_date, datetime.now()):
+        return
+    path = _download_cache_path(ticker, start_date, end_date)
+    tmp_path = path + '.tmp'
+    try:
+        _ensure_dir(DOWNLOAD_CACHE_DIR)
+        df.to_parquet(tmp_path, index=False, compression='zstd')
+        os.replace(tmp_path, path)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not cache download of {ticker}: {e}")
+
+def download_nasdaq_data(ticker: str, start_date: str, end_date: str,
+                         session: requests.Session | None = None, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Downloads daily historical stock data from nasdaq.com for a given ticker.
+
+    Results are memoized in-process and, once the date range has ended, on disk
+    under DOWNLOAD_CACHE_DIR, so repeated requests for the same range skip the API.
+
+    Args:
+        ticker (str): The stock ticker symbol (e.g., 'AAPL').
+        start_date (str): The start date in 'YYYY-MM-DD' format.
+        end_date (str): The end date in 'YYYY-MM-DD' format.
+        session (requests.Session | None): The session to use. Defaults to the shared module session.
+        use_cache (bool): Whether to look up and store the result in the download cache.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the historical data (Date, Close,
+                      Volume, Open, High, Low), or None if an error occurs.
+
+    Raises:
+        RateLimitError: If the API responds with HTTP 429.
+    """
+    if not use_cache:
+        return _fetch_nasdaq_data(ticker, start_date, end_date, session=session)
+
+    key = (ticker.upper(), start_date, end_date)
+    with _memo_lock:
+        df = _memo.get(key)
+    if df is None:
+        df = _read_download_cache(*key)
+        if df is None:
+            df = _fetch_nasdaq_data(ticker, start_date, end_date, session=session)
+            if df is None:
+                return None
+            _write_download_cache(df, *key)
+        with _memo_lock:
+            _memo[key] = df
+            if len(_memo) > DOWNLOAD_MEMO_SIZE:
+                del _memo[next(iter(_memo))]
+    # Callers get their own copy so they cannot modify the memoized frame.
+    return df.copy()
+
+def parquet_path(csv_path: str) -> str:
+    """Returns the path of the Parquet copy stored next to a price CSV."""
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+def write_parquet(df: pd.DataFrame, csv_path: str) -> bool:
+    """
+    Writes a Parquet copy of a price DataFrame next to its CSV file.
+
+    Parquet stores the dates and prices as typed columns, so later reads skip
+    CSV parsing entirely and can load just the columns they need.
+
+    Args:
+        df (pd.DataFrame): The price data, with a 'Date' column.
+        csv_path (str): The path of the CSV file the data was saved to.
+
+    Returns:
+        bool: True if the Parquet file was written.
+    """
+    if not HAS_PYARROW:
+        return False
+    pq_path = parquet_path(csv_path)
+    tmp_path = pq_path + '.tmp'
+    try:
+        # Write to a temporary file first so an interrupted write never leaves a truncated copy.
+        df.to_parquet(tmp_path, index=False, compression='zstd')
+        os.replace(tmp_path, pq_path)
+        return True
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not write Parquet copy of {csv_path}: {e}")
+        return False
+
+def filename_date_range(filename: str) -> tuple[datetime, datetime] | None:
+    """
+    Parses the date range from a data filename of the form TICKER_YYYY-MM-DD_to_YYYY-MM-DD.csv.
+
+    Args:
+        filename (str): The data file name.
+
+    Returns:
+        tuple[datetime, datetime] | None: The start and end dates, or None if the name doesn't match.
+    """
+    parts = os.path.splitext(filename)[0].split('_')
+    try:
+        return datetime.strptime(parts[1], '%Y-%m-%d'), datetime.strptime(parts[3], '%Y-%m-%d')
+    except (IndexError, ValueError):
+        return None
+
+def data_file_sort_key(filename: str) -> tuple[datetime, str]:
+    """
+    Orders a ticker's data files so the one with the latest end date sorts last.
+
+    Every download run writes a new TICKER_<start>_to_<end>.csv next to the old
+    ones, so the file with the latest end date holds the freshest prices.
+
+    Args:
+        filename (str): The data file name.
+
+    Returns:
+        tuple[datetime, str]: The end date from the name (datetime.min if it has none) and the name itself.
+    """
+    date_range = filename_date_range(filename)
+    return (date_range[1] if date_range is not None else datetime.min), filename
+
+def latest_data_files(data_folder: str) -> dict[str, os.DirEntry]:
+    """
+    Finds the newest data file of each ticker with a single directory scan.
+
+    Every CSV counts as a data file of the ticker before its first underscore.
+    Files whose names have no TICKER_<start>_to_<end> date range sort before
+    any dated file of the same ticker.
+
+    Args:
+        data_folder (str): The path to the folder containing stock data CSVs.
+
+    Returns:
+        dict[str, os.DirEntry]: A dictionary mapping tickers to the directory entry of
+                                their data file with the latest end date.
+    """
+    latest = {}
+    # DirEntry objects carry the name and file type without extra stat calls.
+    with os.scandir(data_folder) as it:
+        for entry in it:
+            if not (entry.name.lower().endswith('.csv') and entry.is_file(follow_symlinks=False)):
+                continue
+            ticker = entry.name.split('_')[0]
+            current = latest.get(ticker)
+            if current is None or data_file_sort_key(entry.name) > data_file_sort_key(current.name):
+                latest[ticker] = entry
+    return latest
+
+def read_price_history(csv_path: str, columns: list[str] | None = None,
+                       start_date: str | None = None, end_date: str | None = None) -> pd.DataFrame:
+    """
+    Reads a price CSV, preferring its Parquet copy when one is up to date.
+
+    The first time a CSV is read without a Parquet copy, the whole file is parsed
+    once and a copy is written, so later reads of any column subset are fast.
+    A date range is pushed down to the Parquet reader, so rows outside it are
+    dropped in Arrow before any pandas objects are built.
+
+    Args:
+        csv_path (str): The path to the stock data CSV.
+        columns (list[str] | None): The columns to return besides the date. None returns all columns.
+        start_date (str | None): The first date to return in 'YYYY-MM-DD' format. None starts at the first row.
+        end_date (str | None): The last date to return in 'YYYY-MM-DD' format. None ends at the last row.
 
+    Returns:
+        pd.DataFrame: The requested columns indexed by a DatetimeIndex named 'Date'.
+    """
+    pq_path = parquet_path(csv_path)
+    usecols = ['Date', *columns] if columns else None
+
+    if os.path.exists(pq_path) and os.path.getmtime(pq_path) >= os.path.getmtime(csv_path):
+        filters = []
+        if start_date:
+            filters.append(('Date', '>=', pd.Timestamp(start_date)))
+        if end_date:
+            filters.append(('Date', '<=', pd.Timestamp(end_date)))
+        df = pd.read_parquet(pq_path, columns=usecols, filters=filters or None)
+    elif HAS_PYARROW:
+        # Arrow parses the ISO dates natively while reading.
+        df = pd.read_csv(csv_path, engine='pyarrow', dtype=PRICE_DTYPES, parse_dates=['Date'])
+        write_parquet(df, csv_path)
+        if usecols:
+            df = df[usecols]
+    else:
+        # An explicit date format skips pandas' date format inference.
+        dtype = {col: PRICE_DTYPES[col] for col in columns} if columns else PRICE_DTYPES
+        df = pd.read_csv(csv_path, usecols=usecols, dtype=dtype, engine='c',
+                         parse_dates=['Date'], date_format='%Y-%m-%d')
+
+    df = df.set_index('Date')
+    if start_date or end_date:
+        df = df.loc[start_date:end_date]
+    return df
+
+def download_ticker(ticker: str, start_date: str | None, end_date: str, output_dir: str = "data",
+                    session: requests.Session | None = None) -> str | None:
+    """
+    Downloads the historical data for a ticker and saves it as a CSV file.
+
+    Args:
+        ticker (str): The stock ticker symbol (e.g., 'AAPL').
+        start_date (str | None): The start date in 'YYYY-MM-DD' format. If None, the full history is downloaded.
+        end_date (str): The end date in 'YYYY-MM-DD' format.
+        output_dir (str): The directory to save the output CSV file.
+        session (requests.Session | None): The session to use. Defaults to the shared module session.
+
+    Returns:
+        str | None: The path of the saved CSV file, or None if no data could be downloaded.
+
+    Raises:
+        RateLimitError: If the API responds with HTTP 429.
+    """
     # If no start date is provided, use a very early date to fetch all history.
     # The Nasdaq API will return data from the actual first trading day.
-    start_date_for_api = args.start if args.start else "1970-01-01"
+    start_date_for_api = start_date if start_date else "1970-01-01"
 
-    historical_data = download_nasdaq_data(args.ticker, start_date_for_api, args.end)
+    historical_data = download_nasdaq_data(ticker, start_date_for_api, end_date, session=session)
 
-    if historical_data is not None and not historical_data.empty:
-        # For the output filename, use the user-provided start date,
-        # or if it was not provided, use the actual earliest date from the data.
-        if args.start:
-            start_date_for_filename = args.start
-        else:
-            # Get the first date from the downloaded data and format it
-            actual_start_date = historical_data['Date'].min()
-            start_date_for_filename = actual_start_date.strftime('%Y-%m-%d')
+    if historical_data is None or historical_data.empty:
+        return None
+
+    # For the output filename, use the user-provided start date,
+    # or if it was not provided, use the actual earliest date from the data.
+    if start_date:
+        start_date_for_filename = start_date
+    else:
+        # Get the first date from the downloaded data and format it
+        actual_start_date = historical_data['Date'].min()
+        start_date_for_filename = actual_start_date.strftime('%Y-%m-%d')
+
+    # --- File Saving ---
+    # Create the output directory if it doesn't exist.
+    _ensure_dir(output_dir)
+
+    # Construct the filename and the full path to save the file.
+    output_filename = f"{ticker.upper()}_{start_date_for_filename}_to_{end_date}.csv"
+    output_filepath = os.path.join(output_dir, output_filename)
 
-        # --- File Saving ---
-        # Define the output directory from the argument and create it if it doesn't exist.
-        output_dir = args.outdir
-        os.makedirs(output_dir, exist_ok=True)
+    historical_data.to_csv(output_filepath, index=False)
+    write_parquet(historical_data, output_filepath)
+    print(f"Data successfully downloaded and saved to {output_filepath}")
+    return output_filepath
 
-        # Construct the filename and the full path to save the file.
-        output_filename = f"{args.ticker.upper()}_{start_date_for_filename}_to_{args.end}.csv"
-        output_filepath = os.path.join(output_dir, output_filename)
+class Backoff:
+    """
+    An adaptive delay shared by all download workers.
+
+    Downloads run at full speed until the server rate limits a request. Each
+    rate-limited response doubles the delay (up to max_delay) and each success
+    halves it, so a transient block does not permanently cap throughput.
+    """
+
+    def __init__(self, initial_delay: float = 1.0, max_delay: float = 60.0):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Sleeps for the current delay before a request is made."""
+        with self._lock:
+            delay = self.delay
+        if delay:
+            time.sleep(delay)
+
+    def on_rate_limited(self, retry_after: float | None) -> float:
+        """Increases the delay and returns how long the rate-limited worker should wait before retrying."""
+        with self._lock:
+            self.delay = min(max(self.delay * 2, self.initial_delay), self.max_delay)
+            return retry_after if retry_after is not None else self.delay
+
+    def on_success(self):
+        """Decays the delay towards zero."""
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay > 0.1 else 0.0
+
+def _download_one(ticker: str, start_date: str | None, end_date: str, output_dir: str,
+                  session: requests.Session, backoff: Backoff) -> tuple[str, bool, str]:
+    """
+    Downloads and saves the data for a single ticker, backing off when rate limited.
+
+    Args:
+        ticker (str): The stock ticker to download.
+        start_date (str | None): The start date for the data download (YYYY-MM-DD).
+        end_date (str): The end date for the data download (YYYY-MM-DD).
+        output_dir (str): The directory to save the output CSV file.
+        session (requests.Session): The session shared by all workers.
+        backoff (Backoff): The back-off delay shared by all workers.
+
+    Returns:
+        tuple[str, bool, str]: The ticker, whether the download succeeded, and a status message.
+    """
+    for _ in range(MAX_RATE_LIMIT_RETRIES + 1):
+        backoff.wait()
+        try:
+            output_filepath = download_ticker(ticker, start_date, end_date, output_dir, session=session)
+        except RateLimitError as e:
+            delay = backoff.on_rate_limited(e.retry_after)
+            print(f"Rate limited while downloading {ticker}. Retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            continue
+        except Exception as e:
+            return ticker, False, f"An unexpected error occurred: {e}"
+
+        backoff.on_success()
+        if output_filepath is None:
+            return ticker, False, "No data was downloaded."
+        return ticker, True, f"Saved to {output_filepath}"
+
+    return ticker, False, f"Still rate limited after {MAX_RATE_LIMIT_RETRIES} retries."
+
+def download_many(tickers: list[str], start_date: str | None, end_date: str, output_dir: str = "data",
+                  workers: int = 8) -> tuple[int, int]:
+    """
+    Downloads and saves the data for many tickers, running up to `workers`
+    downloads concurrently over a shared keep-alive session.
+
+    Args:
+        tickers (list[str]): The stock tickers to download.
+        start_date (str | None): The start date in 'YYYY-MM-DD' format. If None, the full history is downloaded.
+        end_date (str): The end date in 'YYYY-MM-DD' format.
+        output_dir (str): The directory to save the output CSV files.
+        workers (int): The maximum number of concurrent downloads.
+
+    Returns:
+        tuple[int, int]: The number of successful and failed downloads.
+    """
+    success_count = 0
+    fail_count = 0
+    backoff = Backoff()
+    # The shared session's pool only fits SESSION_POOL_SIZE connections.
+    session = _SESSION if workers <= SESSION_POOL_SIZE else create_session(pool_size=workers)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_download_one, ticker, start_date, end_date, output_dir, session, backoff): ticker
+            for ticker in tickers
+        }
+        for i, future in enumerate(as_completed(futures)):
+            ticker, ok, message = future.result()
+            print(f"\n--- [{i+1}/{len(tickers)}] Finished {ticker} ---")
+            if ok:
+                print(message)
+                success_count += 1
+            else:
+                print(f"ERROR downloading {ticker}: {message}")
+                fail_count += 1
+
+    print("\n--- Download Summary ---")
+    print(f"Successful: {success_count}")
+    print(f"Failed:     {fail_count}")
+    print("------------------------")
+    return success_count, fail_count
+
+def parse_tickers(value: str) -> list[str]:
+    """
+    Parses the tickers given on the command line.
+
+    Args:
+        value (str): A comma-separated list of tickers, or the path of a file with
+                     one ticker per line (commas are also accepted).
+
+    Returns:
+        list[str]: The unique tickers in the order they were given.
+    """
+    if os.path.isfile(value):
+        with open(value, 'r') as f:
+            value = f.read().replace('\n', ',')
+    tickers = [t.strip().upper() for t in value.split(',')]
+    return list(dict.fromkeys(t for t in tickers if t))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Download historical stock data from Nasdaq.")
+    parser.add_argument("tickers", help="Comma-separated stock ticker symbols (e.g., AAPL,GOOG), or a file with one ticker per line. Note: Nasdaq.com typically provides about 10 years of historical data.")
+    parser.add_argument("--start", default=None, help="Start date in YYYY-MM-DD format. If not provided, downloads from the earliest available date.")
+    parser.add_argument("--end", default=datetime.now().strftime('%Y-%m-%d'), help="End date in YYYY-MM-DD format.")
+    parser.add_argument("--outdir", default="data", help="The directory to save the output CSV files. Defaults to 'data'.")
+    parser.add_argument("--workers", type=int, default=8, help="Number of tickers to download concurrently. Defaults to 8.")
+    args = parser.parse_args()
 
-        historical_data.to_csv(output_filepath, index=False)
-        print(f"Data successfully downloaded and saved to {output_filepath}")
\ No newline at end of file
+    tickers = parse_tickers(args.tickers)
+    if not tickers:
+        print("Error: No tickers given.")
+    else:
+        # A single ticker also goes through download_many, so rate limits are retried with backoff.
+        download_many(tickers, args.start, args.end, output_dir=args.outdir,
+                      workers=max(1, min(args.workers, len(tickers))))
@@ -1,65 +1,67 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
 import argparse
 import os
-import glob
-import subprocess
-import sys
+from datetime import datetime
+from nasdaq_downloader import RateLimitError, download_ticker, latest_data_files, read_price_history
 
 
 def load_data(ticker: str, start_date_str: str = None, end_date_str: str = None) -> pd.DataFrame | None:
-    """Finds, loads, and filters the stock data from a CSV file."""
+    """Finds, loads, and filters the stock data from a CSV file (or its cached Parquet copy)."""
     data_folder = os.path.join(os.path.dirname(__file__), 'data')
-    search_pattern = os.path.join(data_folder, f"{ticker.upper()}_*_to_*.csv")
-    matching_files = glob.glob(search_pattern)
+    # The same newest-file rule as scoring, so a plot always shows the data that was scored.
+    data_file = latest_data_files(data_folder).get(ticker.upper()) if os.path.isdir(data_folder) else None
 
-    if not matching_files:
+    if data_file is None:
         print(f"No data file found for ticker '{ticker}'. Attempting to download...")
-        downloader_script = os.path.join(os.path.dirname(__file__), 'nasdaq_downloader.py')
-        
-        command = [sys.executable, downloader_script, ticker]
         # If start/end dates are passed to the plotting script, use them for the download.
-        # Otherwise, the downloader will fetch the full history by default.
-        if start_date_str:
-            command.extend(['--start', start_date_str])
-        if end_date_str:
-            command.extend(['--end', end_date_str])
-
+        # Otherwise, the full history up to today is downloaded.
+        end_date_for_download = end_date_str or datetime.now().strftime('%Y-%m-%d')
         try:
-            # Using check=True will raise CalledProcessError on non-zero exit codes.
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
-            print(result.stdout)
-            print("Download successful. Reloading data...")
-            matching_files = glob.glob(search_pattern)
-            if not matching_files:
-                print("Error: Data downloaded but still could not find the file.")
-                return None
-        except (FileNotFoundError, subprocess.CalledProcessError) as e:
-            print(f"Error running downloader script for {ticker}:\n{e}")
+            output_filepath = download_ticker(ticker, start_date_str, end_date_for_download, output_dir=data_folder)
+        except RateLimitError as e:
+            print(f"Error downloading data for {ticker}: {e}")
             return None
-
-    data_filepath = matching_files[0]
-    if len(matching_files) > 1:
-        print(f"Warning: Multiple files found for {ticker}. Using '{os.path.basename(data_filepath)}'")
+        if output_filepath is None:
+            print(f"Error: Could not download data for {ticker}.")
+            return None
+        print("Download successful. Reloading data...")
+        data_filepath = output_filepath
+    else:
+        data_filepath = data_file.path
 
     print(f"Loading data from: {os.path.basename(data_filepath)}")
 
     try:
-        df = pd.read_csv(data_filepath, parse_dates=['Date'], index_col='Date')
+        # Reads the Parquet copy of the CSV when it is up to date, and writes one otherwise.
+        # Only the requested date range is loaded.
+        df = read_price_history(data_filepath, start_date=start_date_str, end_date=end_date_str)
+        if df.empty and (start_date_str or end_date_str):
+            full_df = read_price_history(data_filepath, columns=['Close'])
+            print(f"Error: No data available for the selected range: {start_date_str or 'start'} to {end_date_str or 'end'}.")
+            print(f"The full data file covers {full_df.index.min().strftime('%Y-%m-%d')} to {full_df.index.max().strftime('%Y-%m-%d')}.")
+            return None
     except Exception as e:
         print(f"Error reading or parsing CSV file: {e}")
         return None
 
-    if start_date_str or end_date_str:
-        original_start = df.index.min().strftime('%Y-%m-%d')
-        original_end = df.index.max().strftime('%Y-%m-%d')
-        df = df.loc[start_date_str:end_date_str]
-        if df.empty:
-            print(f"Error: No data available for the selected range: {start_date_str or 'start'} to {end_date_str or 'end'}.")
-            print(f"The full data file covers {original_start} to {original_end}.")
-            return None
-    return df
+    # float32 prices are far more precise than the charts need and halve the memory
+    # the metric calculations and plotting have to stream through.
+    dtypes = {col: 'float32' for col in ['Open', 'High', 'Low', 'Close'] if col in df.columns}
+    if 'Volume' in df.columns and df['Volume'].max() <= np.iinfo(np.int32).max:
+        dtypes['Volume'] = 'int32'
+    return df.astype(dtypes, copy=False)
+
+
+def _pct_change(values: np.ndarray, periods: int) -> np.ndarray:
+    """Equivalent of Series.pct_change(periods) that divides views of `values` straight into the output array."""
+    out = np.full(values.size, np.nan, dtype=values.dtype)
+    if values.size > periods:
+        np.divide(values[periods:], values[:-periods], out=out[periods:])
+        out[periods:] -= 1.0
+    return out
 
 
 def calculate_metrics(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
@@ -68,23 +70,29 @@ def calculate_metrics(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
     and a dictionary of key statistics for plotting.
     """
     # --- Drawdown ---
-    df['Peak'] = df['Close'].cummax()
-    df['Drawdown'] = (df['Close'] - df['Peak']) / df['Peak']
+    # Computed on the raw arrays to skip pandas' per-operation overhead.
+    close = df['Close'].to_numpy()
+    peak = np.maximum.accumulate(close)
+    df['Peak'] = peak
+    df['Drawdown'] = (close - peak) / peak
 
     # --- Rolling Returns ---
-    df['Return_1Y'] = df['Close'].pct_change(periods=252)
-    df['Return_2Y'] = df['Close'].pct_change(periods=504)  # Approx 252 * 2
-    df['Return_3Y'] = df['Close'].pct_change(periods=252*3) # Approx 252 * 3
+    df['Return_1Y'] = _pct_change(close, 252)
+    df['Return_2Y'] = _pct_change(close, 504)  # Approx 252 * 2
+    df['Return_3Y'] = _pct_change(close, 252*3) # Approx 252 * 3
 
     # --- Key Statistics for Annotations ---
     stats = {}
     stats['max_drawdown_date'] = df['Drawdown'].idxmin()
     stats['max_drawdown_value'] = df['Drawdown'].min()
     peak_value = df.loc[stats['max_drawdown_date'], 'Peak']
-    stats['peak_date'] = df[df['Close'] == peak_value].index[0]
-    post_trough_df = df.loc[stats['max_drawdown_date']:]
-    recovery_dates = post_trough_df[post_trough_df['Close'] >= peak_value].index
-    stats['recovery_date'] = recovery_dates[0] if len(recovery_dates) > 0 else None
+    # The peak is the highest close up to the trough, so there is no need to scan the whole series for it.
+    trough_loc = df.index.get_loc(stats['max_drawdown_date'])
+    stats['peak_date'] = df['Close'].iloc[:trough_loc + 1].idxmax()
+    # The recovery is the first close from the trough onwards that is back at the peak.
+    recovered = close[trough_loc:] >= peak_value
+    recovery_idx = recovered.argmax()
+    stats['recovery_date'] = df.index[trough_loc + recovery_idx] if recovered[recovery_idx] else None
 
     return df, stats
 
@@ -143,27 +151,21 @@ def plot_rolling_return_chart(ax: plt.Axes, df: pd.DataFrame, stats: dict):
 # --- MAIN ORCHESTRATION ---
 # ==============================================================================
 
-def run_and_plot_analysis(ticker: str, start_date_str: str = None, end_date_str: str = None, output_path: str | None = None):
-    """Main function to orchestrate data loading, analysis, and plotting."""
-    df = load_data(ticker, start_date_str, end_date_str)
-    if df is None:
-        return
-
-    df, stats = calculate_metrics(df)
-
-    # --- Plotting Configuration ---
-    # To add a new plot, add a new dictionary to this list.
-    # 'function': The plotting function to call.
-    # 'title': The title for the subplot.
-    # 'height_ratio': The relative height of the subplot.
-    plot_configs = [
-        {'function': plot_price_chart, 'title': 'Stock Price', 'height_ratio': 3},
-        {'function': plot_drawdown_chart, 'title': 'Drawdown from Peak', 'height_ratio': 1},
-        {'function': plot_rolling_return_chart, 'title': 'Rolling Returns', 'height_ratio': 1},
-    ]
-
-    num_plots = len(plot_configs)
-    height_ratios = [p['height_ratio'] for p in plot_configs]
+# --- Plotting Configuration ---
+# To add a new plot, add a new dictionary to this list.
+# 'function': The plotting function to call.
+# 'title': The title for the subplot.
+# 'height_ratio': The relative height of the subplot.
+PLOT_CONFIGS = [
+    {'function': plot_price_chart, 'title': 'Stock Price', 'height_ratio': 3},
+    {'function': plot_drawdown_chart, 'title': 'Drawdown from Peak', 'height_ratio': 1},
+    {'function': plot_rolling_return_chart, 'title': 'Rolling Returns', 'height_ratio': 1},
+]
+
+def _create_figure() -> tuple[plt.Figure, list[plt.Axes]]:
+    """Creates the figure and one subplot per entry in PLOT_CONFIGS."""
+    num_plots = len(PLOT_CONFIGS)
+    height_ratios = [p['height_ratio'] for p in PLOT_CONFIGS]
 
     fig, axes = plt.subplots(
         num_plots, 1,
@@ -173,23 +175,37 @@ def run_and_plot_analysis(ticker: str, start_date_str: str = None, end_date_str:
     )
     if num_plots == 1:
         axes = [axes] # Ensure axes is always a list
+    return fig, axes
 
+def _render(fig: plt.Figure, axes: list[plt.Axes], ticker: str, df: pd.DataFrame, stats: dict, show_range: bool):
+    """Draws the analysis for one ticker onto an existing figure, clearing whatever it showed before."""
     # --- Generate Plots ---
-    for i, config in enumerate(plot_configs):
-        ax = axes[i]
+    for ax, config in zip(axes, PLOT_CONFIGS):
+        ax.cla()
         config['function'](ax, df, stats)
         ax.set_title(config['title'])
 
     # --- Final Figure Formatting ---
     main_title = f'{ticker.upper()} Price and Risk Analysis'
-    if start_date_str or end_date_str:
+    if show_range:
         plot_start = df.index.min().strftime('%Y-%m-%d')
         plot_end = df.index.max().strftime('%Y-%m-%d')
         main_title += f'\n({plot_start} to {plot_end})'
     fig.suptitle(main_title, fontsize=16)
 
-    plt.xlabel('Date')
-    plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+    axes[-1].set_xlabel('Date')
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+
+def run_and_plot_analysis(ticker: str, start_date_str: str = None, end_date_str: str = None, output_path: str | None = None):
+    """Main function to orchestrate data loading, analysis, and plotting."""
+    df = load_data(ticker, start_date_str, end_date_str)
+    if df is None:
+        return
+
+    df, stats = calculate_metrics(df)
+
+    fig, axes = _create_figure()
+    _render(fig, axes, ticker, df, stats, show_range=bool(start_date_str or end_date_str))
 
     if output_path:
         print(f"Saving plot to {output_path}...")
@@ -200,6 +216,49 @@ def run_and_plot_analysis(ticker: str, start_date_str: str = None, end_date_str:
     else:
         plt.show()
 
+def plot_many(tickers: list[str], output_dir: str, start_date_str: str = None,
+              end_date_str: str = None) -> dict[str, str | None]:
+    """
+    Saves the analysis plot of each ticker as '<ticker>.png' in output_dir.
+
+    One figure is created and redrawn for every ticker, which avoids rebuilding
+    the subplots, spines and text objects each time. This switches the process
+    to the non-interactive Agg backend.
+
+    Args:
+        tickers (list[str]): The stock tickers to plot.
+        output_dir (str): The directory where the plot images will be saved.
+        start_date_str (str): Start date for analysis in YYYY-MM-DD format.
+        end_date_str (str): End date for analysis in YYYY-MM-DD format.
+
+    Returns:
+        dict[str, str | None]: The absolute path of each ticker's plot, or None if it could not be generated.
+    """
+    plt.switch_backend('Agg')
+    os.makedirs(output_dir, exist_ok=True)
+    fig, axes = _create_figure()
+    figures = {}
+
+    for ticker in tickers:
+        print(f"Generating plot for {ticker}...")
+        output_path = os.path.join(output_dir, f"{ticker}.png")
+        try:
+            df = load_data(ticker, start_date_str, end_date_str)
+            if df is None:
+                figures[ticker] = None
+                continue
+            df, stats = calculate_metrics(df)
+            _render(fig, axes, ticker, df, stats, show_range=bool(start_date_str or end_date_str))
+            # The layout is already tight, so the extra draw needed to crop to a tight bbox is skipped.
+            fig.savefig(output_path)
+            figures[ticker] = os.path.abspath(output_path)
+        except Exception as e:
+            print(f"  -> Error generating plot for {ticker}: {e}")
+            figures[ticker] = None
+
+    plt.close(fig)
+    return figures
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Plot the historical price and max drawdown for a stock from a local CSV file.")
     parser.add_argument("ticker", help="Stock ticker symbol (e.g., GOOG) to plot.")
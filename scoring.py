@@ -1,8 +1,87 @@
+import math
+import os
 import numpy as np
-from sklearn.linear_model import LinearRegression
 from typing import Union
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to the NumPy implementation
+    njit = None
+
+def _score_components_numpy(prices_arr: np.ndarray, annualization_factor: int) -> tuple[float, float, float]:
+    """Computes (annualized return, max drawdown, slope-to-noise) with NumPy array operations."""
+    log_prices = np.log(prices_arr)
+
+    ann_return = (prices_arr[-1] / prices_arr[0]) ** (annualization_factor / len(prices_arr)) - 1
+    rolling_max = np.maximum.accumulate(prices_arr)
+    drawdowns = (rolling_max - prices_arr) / rolling_max
+    max_dd = np.max(drawdowns)
+
+    # Slope to noise (trend fit), using the closed-form OLS fit on x = 0..n-1
+    n = log_prices.size
+    x = np.arange(n)
+    x_mean = (n - 1) / 2.0
+    y_mean = log_prices.mean()
+    s_xx = n * (n * n - 1) / 12.0
+    s_xy = np.dot(log_prices - y_mean, x - x_mean)
+    slope = s_xy / s_xx
+    intercept = y_mean - slope * x_mean
+    residuals = log_prices - (intercept + slope * x)
+    noise = np.std(residuals)
+    slope_to_noise = slope / noise if noise != 0 else 0
+
+    return ann_return, max_dd, slope_to_noise
+
+def _score_components_fused(prices_arr: np.ndarray, annualization_factor: int) -> tuple[float, float, float]:
+    """
+    Computes (annualized return, max drawdown, slope-to-noise) in a single pass.
+
+    The running peak, max drawdown and the sums needed for the OLS trend fit are
+    accumulated together, so no intermediate arrays are allocated. Log prices are
+    taken relative to the first price to keep the sums well-conditioned. Only
+    fast when compiled with numba.
+    """
+    n = prices_arr.size
+    first = prices_arr[0]
+    log_first = math.log(first)
+    peak = first
+    max_dd = 0.0
+    s_y = 0.0
+    s_xy = 0.0
+    s_yy = 0.0
+    for i in range(n):
+        p = prices_arr[i]
+        if p > peak:
+            peak = p
+        dd = (peak - p) / peak
+        if dd > max_dd:
+            max_dd = dd
+        y = math.log(p) - log_first
+        s_y += y
+        s_xy += i * y
+        s_yy += y * y
+
+    ann_return = (prices_arr[n - 1] / first) ** (annualization_factor / n) - 1
+
+    # Closed-form OLS on x = 0..n-1; the residual variance follows from the same sums.
+    x_mean = (n - 1) / 2.0
+    s_xx = n * (n * n - 1) / 12.0
+    y_mean = s_y / n
+    slope = (s_xy - x_mean * s_y) / s_xx
+    residual_var = s_yy / n - y_mean * y_mean - slope * slope * s_xx / n
+    noise = math.sqrt(residual_var) if residual_var > 0 else 0.0
+    slope_to_noise = slope / noise if noise != 0 else 0.0
+
+    return ann_return, max_dd, slope_to_noise
+
+if njit is not None:
+    # nogil lets score_universe run the compiled kernel on several threads at once.
+    _score_components = njit(cache=True, fastmath=True, nogil=True)(_score_components_fused)
+else:
+    _score_components = _score_components_numpy
+
 def compute_stock_score(
     price_series: Union[np.ndarray, pd.Series],
     ann_return_weight: float = 2.0,
@@ -33,23 +112,98 @@ def compute_stock_score(
     if len(prices_arr) < 2:
         return -np.inf  # Not enough data to compute a score
 
-    log_prices = np.log(prices_arr)
-    returns = np.diff(log_prices)
-
-    ann_return = (prices_arr[-1] / prices_arr[0]) ** (annualization_factor / len(prices_arr)) - 1
-    rolling_max = np.maximum.accumulate(prices_arr)
-    drawdowns = (rolling_max - prices_arr) / rolling_max
-    max_dd = np.max(drawdowns)
-
-    # Slope to noise (trend fit)
-    x = np.arange(len(log_prices)).reshape(-1, 1)
-    model = LinearRegression().fit(x, log_prices)
-    slope = model.coef_[0]
-    residuals = log_prices - model.predict(x)
-    noise = np.std(residuals)
-    slope_to_noise = slope / noise if noise != 0 else 0
+    ann_return, max_dd, slope_to_noise = _score_components(
+        np.ascontiguousarray(prices_arr, dtype=np.float64), annualization_factor)
 
     score = (ann_return_weight * ann_return +
              max_dd_weight * max_dd +
              slope_to_noise_weight * slope_to_noise)
     return score
+
+
+def score_universe(
+    prices_by_ticker: dict[str, Union[np.ndarray, pd.Series]],
+    ann_return_weight: float = 2.0,
+    max_dd_weight: float = -3.0,
+    slope_to_noise_weight: float = 1.0,
+    annualization_factor: int = 252,
+) -> dict[str, float]:
+    """
+    Computes the same score as compute_stock_score for many stocks at once.
+
+    With numba, the tickers are split across threads that each run the compiled
+    single-pass kernel, which releases the GIL. Without it, the price series are
+    packed into one NaN-padded 2-D array (one row per ticker) so each metric is a
+    single vectorised NumPy reduction over all tickers.
+
+    Args:
+        prices_by_ticker (dict[str, Union[np.ndarray, pd.Series]]): Price series keyed by ticker.
+        ann_return_weight (float): Weight for the annualized return component.
+        max_dd_weight (float): Weight for the maximum drawdown component.
+        slope_to_noise_weight (float): Weight for the slope-to-noise component.
+        annualization_factor (int): Trading days in a year for annualization.
+
+    Returns:
+        dict[str, float]: The computed score for each ticker.
+    """
+    # Not enough data to compute a score
+    scores = {ticker: -np.inf for ticker, s in prices_by_ticker.items() if len(s) < 2}
+    tickers = [ticker for ticker in prices_by_ticker if ticker not in scores]
+    if not tickers:
+        return scores
+
+    if njit is not None:
+        series = [np.ascontiguousarray(prices_by_ticker[ticker], dtype=np.float64) for ticker in tickers]
+        workers = min(os.cpu_count() or 1, len(series))
+        # One contiguous chunk of tickers per thread keeps the per-task overhead negligible.
+        size = -(-len(series) // workers)
+        chunks = [series[i:i + size] for i in range(0, len(series), size)]
+
+        def score_chunk(chunk: list[np.ndarray]) -> list[float]:
+            chunk_scores = []
+            for prices_arr in chunk:
+                ann_return, max_dd, slope_to_noise = _score_components(prices_arr, annualization_factor)
+                chunk_scores.append(ann_return_weight * ann_return +
+                                    max_dd_weight * max_dd +
+                                    slope_to_noise_weight * slope_to_noise)
+            return chunk_scores
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            batch_scores = [score for chunk_scores in executor.map(score_chunk, chunks) for score in chunk_scores]
+        scores.update(zip(tickers, batch_scores))
+        return scores
+
+    series = [np.asarray(prices_by_ticker[ticker], dtype=np.float64) for ticker in tickers]
+    lengths = np.array([len(s) for s in series])
+    prices = np.full((len(series), lengths.max()), np.nan)
+    for i, s in enumerate(series):
+        prices[i, :len(s)] = s
+    rows = np.arange(len(series))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        first = prices[:, 0]
+        last = prices[rows, lengths - 1]
+        ann_return = (last / first) ** (annualization_factor / lengths) - 1
+
+        # fmax ignores the NaN padding, so each row's running max stops changing after its last price.
+        rolling_max = np.fmax.accumulate(prices, axis=1)
+        max_dd = np.nanmax((rolling_max - prices) / rolling_max, axis=1)
+
+        # Slope to noise (trend fit), using the closed-form OLS fit on x = 0..n-1
+        log_prices = np.log(prices)
+        x = np.arange(prices.shape[1])
+        x_mean = (lengths - 1) / 2.0
+        y_mean = np.nansum(log_prices, axis=1) / lengths
+        s_xx = lengths * (lengths ** 2 - 1) / 12.0
+        s_xy = np.nansum((log_prices - y_mean[:, None]) * (x - x_mean[:, None]), axis=1)
+        slope = s_xy / s_xx
+        intercept = y_mean - slope * x_mean
+        residuals = log_prices - (intercept[:, None] + slope[:, None] * x)
+        noise = np.nanstd(residuals, axis=1)
+        slope_to_noise = np.where(noise != 0, slope / noise, 0)
+
+    batch_scores = (ann_return_weight * ann_return +
+                    max_dd_weight * max_dd +
+                    slope_to_noise_weight * slope_to_noise)
+    scores.update(zip(tickers, batch_scores.tolist()))
+    return scores